@@ -1,5 +1,6 @@
 from shiny import App, ui, render, reactive
 import pandas as pd
+import numpy as np
 import folium
 from shiny.types import SilentException
 from folium.plugins import HeatMap
@@ -7,8 +8,15 @@ import branca.colormap as cm
 import plotly.express as px
 import plotly.graph_objects as go
 
-# Data loading function
-def load_data(status_filter=None, output_filter=None, topic_filter=None, subfund_filter=None, contrib_range=None):
+# Fixed filter options (topics and sub-funds come from the data)
+STATUS_CHOICES = ["SIGNED", "CLOSED", "TERMINATED"]
+OUTPUT_CHOICES = ["1", "0"]
+
+# Funding slider step; contribution buckets of the aggregate cube are aligned to it
+CONTRIB_STEP = 1_000_000
+
+# Source loading function
+def load_sources():
     try:
         # Cache data to avoid reloading
         if not hasattr(load_data, 'org_df'):
@@ -32,6 +40,12 @@ def load_data(status_filter=None, output_filter=None, topic_filter=None, subfund
     else:
         proj_df['output'] = pd.to_numeric(proj_df['output'], errors='coerce').fillna(0)
 
+    return org_df, proj_df
+
+# Data loading function
+def load_data(status_filter=None, output_filter=None, topic_filter=None, subfund_filter=None, contrib_range=None):
+    org_df, proj_df = load_sources()
+
     # Apply filters
     if status_filter and status_filter != "ALL":
         proj_df = proj_df[proj_df['status'] == status_filter.strip().upper()].copy()
@@ -99,6 +113,81 @@ def load_data(status_filter=None, output_filter=None, topic_filter=None, subfund
 
     return pd.DataFrame(map_data)
 
+# Aggregate cube dimensions: status x output x topic x sub-fund x contribution bucket
+CUBE_DIMS = ['status', 'output', 'topic', 'sub_fund', 'contrib_bucket']
+
+# Contribution bucket function
+def contrib_bucket(contribution):
+    # Even buckets hold values sitting exactly on a slider step, odd buckets the open
+    # interval above it, so a step-aligned [min, max] range is a run of whole buckets
+    steps = contribution / CONTRIB_STEP
+    floor = np.floor(steps)
+    return 2 * floor + (steps != floor)
+
+# Aggregate cube building function
+def build_cube(org_df, proj_df):
+    # Projects whose lead organization has valid coordinates (same rules as load_data)
+    lead = org_df[org_df['order'] == 1].drop_duplicates('projectID', keep='first')
+    coords = lead['geolocation'].astype(str).str.split(',')
+    lat = pd.to_numeric(coords.str[0].str.strip(), errors='coerce')
+    lon = pd.to_numeric(coords.str[1].str.strip(), errors='coerce')
+    valid = (coords.str.len() == 2) & lat.between(-90, 90) & lon.between(-180, 180)
+    located_ids = lead.loc[valid, 'projectID']
+
+    contribution = pd.to_numeric(proj_df['ecMaxContribution'], errors='coerce')
+    cells = pd.DataFrame({
+        'status': proj_df['status'],
+        'output': proj_df['output'],
+        'topic': proj_df['topic'] if 'topic' in proj_df.columns else None,
+        'sub_fund': proj_df['sub-fund'] if 'sub-fund' in proj_df.columns else None,
+        'contrib_bucket': contrib_bucket(contribution),
+        'located': proj_df['id'].isin(located_ids),
+        'contribution': contribution
+    })
+
+    return cells.groupby(CUBE_DIMS, dropna=False).agg(
+        projects=('located', 'size'),
+        located=('located', 'sum'),
+        funding=('contribution', 'sum')
+    ).reset_index()
+
+# Aggregate cube loading function
+def load_cube():
+    org_df, proj_df = load_sources()
+
+    # Build once per data snapshot
+    snapshot = (id(org_df), id(proj_df))
+    if getattr(load_cube, 'snapshot', None) != snapshot:
+        load_cube.cube = build_cube(org_df, proj_df)
+        load_cube.snapshot = snapshot
+
+    return load_cube.cube
+
+# Cube slicing function, mirroring the filters of load_data
+def cube_cells(cube, status_filter=None, output_filter=None, topic_filter=None, subfund_filter=None, contrib_range=None):
+    mask = pd.Series(True, index=cube.index)
+
+    if status_filter and status_filter != "ALL":
+        mask &= cube['status'] == status_filter.strip().upper()
+
+    if output_filter is not None and output_filter != "ALL":
+        mask &= cube['output'] == int(output_filter)
+
+    if topic_filter and topic_filter != "ALL":
+        mask &= cube['topic'] == topic_filter
+
+    if subfund_filter and subfund_filter != "ALL":
+        mask &= cube['sub_fund'] == subfund_filter
+
+    if contrib_range:
+        low, high = contrib_range
+        # Ranges off the slider steps cut through buckets and cannot be answered exactly
+        if low % CONTRIB_STEP or high % CONTRIB_STEP:
+            return None
+        mask &= cube['contrib_bucket'].between(2 * (low // CONTRIB_STEP), 2 * (high // CONTRIB_STEP))
+
+    return cube[mask]
+
 # UI with sidebar layout
 app_ui = ui.page_fluid(
     ui.tags.head(
@@ -307,10 +396,10 @@ app_ui = ui.page_fluid(
                 ui.div(
                     {"class": "control-group"},
                     ui.input_select("status_filter", "Project Status:",
-                                  choices=["ALL", "SIGNED", "CLOSED", "TERMINATED"],
+                                  choices=["ALL"] + STATUS_CHOICES,
                                   selected="ALL"),
                     ui.input_select("output_filter", "Has Output:",
-                                  choices=["ALL", "1", "0"],
+                                  choices=["ALL"] + OUTPUT_CHOICES,
                                   selected="ALL"),
                     ui.input_select("topic_filter", "Research Topic:",
                                   choices=["ALL"],
@@ -323,7 +412,7 @@ app_ui = ui.page_fluid(
                 ui.div(
                     {"class": "control-group"},
                     ui.input_slider("contrib_filter", "Funding Range (€):",
-                                  min=0, max=500_000_000,
+                                  min=0, max=500_000_000, step=CONTRIB_STEP,
                                   value=(0, 500_000_000))
                 ),
                 
@@ -378,21 +467,68 @@ app_ui = ui.page_fluid(
 
 # Server logic
 def server(input, output, session):
-    # Initialize filter options
+    # Aggregate cube for the current data snapshot
+    @reactive.Calc
+    def cube_data():
+        try:
+            return load_cube()
+        except Exception:
+            return None
+
+    # Current filter values, optionally leaving one filter out
+    def current_filters(exclude=None):
+        filters = {}
+        for name in ["status_filter", "output_filter", "topic_filter", "subfund_filter"]:
+            if name != exclude:
+                filters[name] = input[name]()
+        filters["contrib_range"] = input.contrib_filter()
+        return filters
+
+    # Label dropdown options with project counts under the other filters
+    def update_option_counts(input_id, dim, values, key=lambda value: value):
+        cells = cube_cells(cube_data(), **current_filters(exclude=input_id))
+        with reactive.isolate():
+            selected = input[input_id]()
+
+        if cells is None:
+            choices = ["ALL"] + values
+        else:
+            counts = cells.groupby(dim)['located'].sum()
+            choices = {"ALL": f"ALL ({int(cells['located'].sum()):,})"}
+            for value in values:
+                choices[value] = f"{value} ({int(counts.get(key(value), 0)):,})"
+
+        ui.update_select(input_id, choices=choices, selected=selected)
+
+    # Topic and sub-fund options
+    @reactive.Calc
+    def filter_options():
+        cube = cube_data()
+        return {
+            'topic': sorted(cube['topic'].dropna().unique().tolist()),
+            'sub_fund': sorted(cube['sub_fund'].dropna().unique().tolist())
+        }
+
+    # Filter option counts
     @reactive.effect
     def _():
-        try:
-            proj_df = pd.read_csv(r"C:\Users\wency\Desktop\project(1).csv", sep=',', on_bad_lines='skip', encoding='utf-8')
+        if cube_data() is not None:
+            update_option_counts("status_filter", "status", STATUS_CHOICES)
+
+    @reactive.effect
+    def _():
+        if cube_data() is not None:
+            update_option_counts("output_filter", "output", OUTPUT_CHOICES, key=int)
 
-            if 'topic' in proj_df.columns:
-                topics = sorted(proj_df['topic'].dropna().unique().tolist())
-                ui.update_select("topic_filter", choices=["ALL"] + topics)
+    @reactive.effect
+    def _():
+        if cube_data() is not None:
+            update_option_counts("topic_filter", "topic", filter_options()['topic'])
 
-            if 'sub-fund' in proj_df.columns:
-                subfunds = sorted(proj_df['sub-fund'].dropna().unique().tolist())
-                ui.update_select("subfund_filter", choices=["ALL"] + subfunds)
-        except Exception:
-            pass
+    @reactive.effect
+    def _():
+        if cube_data() is not None:
+            update_option_counts("subfund_filter", "sub_fund", filter_options()['sub_fund'])
 
     # Filter data
     @reactive.Calc
@@ -414,18 +550,27 @@ def server(input, output, session):
     @output
     @render.ui
     def stats_cards():
-        df = filtered_data()
-        if df.empty:
+        cube = cube_data()
+        cells = None if cube is None else cube_cells(cube, **current_filters())
+
+        if cells is None:
+            # Cube unavailable or funding range off the slider steps: use the map data
+            df = filtered_data()
+            total_projects = len(df)
+            with_output = (df['output'] == 1).sum() if total_projects else 0
+            without_output = (df['output'] == 0).sum() if total_projects else 0
+        else:
+            total_projects = int(cells['located'].sum())
+            with_output = int(cells.loc[cells['output'] == 1, 'located'].sum())
+            without_output = int(cells.loc[cells['output'] == 0, 'located'].sum())
+
+        if total_projects == 0:
             return ui.div(
                 {"class": "stat-card total-projects"},
                 ui.span("0", class_="stat-number"),
                 ui.span("No Data Available", class_="stat-label")
             )
         
-        total_projects = len(df)
-        with_output = (df['output'] == 1).sum()
-        without_output = (df['output'] == 0).sum()
-        
         return [
             ui.div(
                 {"class": "stat-card total-projects"},